@@ -0,0 +1,131 @@
+"""
+Per-aircraft parsing for get_flights().
+
+Kept free of pydantic / httpx / numpy and fully annotated so it can be
+compiled ahead of time with mypyc. The Docker image does this in its
+build stage; locally:
+
+    mypyc _flight_parse.py
+
+`import _flight_parse` prefers the compiled extension over this file,
+so a locally built .so must be rebuilt (or deleted) after every edit
+here, or it will silently shadow the change. Without it the plain
+Python module is used.
+"""
+from typing import Any, Dict, Optional
+
+# ---------------------------------------------------------------------
+# Airline lookup
+# ---------------------------------------------------------------------
+
+
+AIRLINE_PREFIXES: Dict[str, str] = {
+    "DAL": "Delta",
+    "AAL": "American",
+    "UAL": "United",
+    "SWA": "Southwest",
+    "JBU": "JetBlue",
+    "NKS": "Spirit",
+    "FFT": "Frontier",
+    "ASA": "Alaska",
+    "RPA": "Republic",
+    "SKW": "SkyWest",
+    "ENY": "Envoy",
+    "GJS": "GoJet",
+    "EJA": "NetJets",
+    "EJM": "Executive Jet Management",
+    "UPS": "UPS",
+    "FDX": "FedEx",
+    "JIA": "PSA",
+    "PDT": "Piedmont",
+    "CPZ": "Compass",
+    "N": "GA Aircraft",
+    "EDV": "Endeavor",
+    "CJT": "CargoJet",
+}
+
+
+def get_airline_from_callsign(cs: str) -> Optional[str]:
+    """
+    Determine airline name from callsign prefix.
+    The callsign must already be stripped and upper-cased.
+    Example:
+      DAL2968 -> Delta
+      UAL1525 -> United
+      N447MM  -> GA Aircraft
+    """
+    # Empty or non-alpha start (e.g. numeric-only): nothing to match
+    if not cs or not cs[0].isalpha():
+        return None
+
+    # US N-number
+    if cs[:1] == "N" and len(cs) >= 2 and cs[1].isalnum():
+        return AIRLINE_PREFIXES.get("N")
+
+    # ICAO prefixes are (up to) the first 3 letters; slice instead of
+    # scanning char by char.
+    prefix = cs[:3]
+    if prefix.isalpha():
+        return AIRLINE_PREFIXES.get(prefix)
+    prefix = cs[:2]
+    if prefix.isalpha():
+        return AIRLINE_PREFIXES.get(prefix)
+    return AIRLINE_PREFIXES.get(cs[:1])
+
+
+# ---------------------------------------------------------------------
+# Aircraft type lookup
+# ---------------------------------------------------------------------
+
+
+def get_aircraft_type(ac: Dict[str, Any]) -> Optional[str]:
+    """Try multiple possible keys for aircraft type."""
+    # Fast path: airplanes.live puts the type code in "t"
+    val = ac.get("t")
+    if isinstance(val, str):
+        val = val.strip()
+        if val and val != "adsb_icao":
+            return val
+
+    for key in ("type", "icao_type", "mdl"):
+        val = ac.get(key)
+        if isinstance(val, str):
+            val = val.strip()
+            if val and val != "adsb_icao":
+                return val
+    return None
+
+
+# ---------------------------------------------------------------------
+# Aircraft record -> Flight fields
+# ---------------------------------------------------------------------
+
+
+def parse_aircraft(ac: Dict[str, Any], dist: float, brg: float, now: int) -> Dict[str, Any]:
+    """
+    Build the Flight field values for one ADS-B aircraft record.
+
+    `ac` must have a callsign and position (get_flights filters those);
+    dist/brg are its precomputed distance (km) and bearing (deg).
+    """
+    # Normalize once; reused for the airline lookup and route cache key
+    cs: str = (ac.get("flight") or ac.get("callsign") or "").strip().upper()
+    alt = ac.get("alt_baro")
+
+    # Motion fields from ADS-B
+    gs = ac.get("gs")
+    baro_rate = ac.get("baro_rate")
+
+    return {
+        "callsign": cs,
+        "airline": get_airline_from_callsign(cs),
+        "origin": None,
+        "destination": None,
+        "aircraft_type": get_aircraft_type(ac),
+        "altitude_ft": int(alt) if isinstance(alt, (int, float)) else None,
+        "distance_km": dist,
+        "bearing_deg": brg,
+        "gs": float(gs) if isinstance(gs, (int, float)) else None,
+        "baro_rate": int(baro_rate) if isinstance(baro_rate, (int, float)) else None,
+        "updated_at": now,
+    }
@@ -1,9 +1,26 @@
-import json
+import orjson
+import numpy as np
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 
-# In-memory index of airports keyed by IATA code
-AIRPORT_INDEX: Dict[str, Dict[str, Any]] = {}
+# In-memory airport table, stored as parallel arrays (structure of arrays)
+# so coordinates can be queried in bulk with NumPy.
+CODES: List[str] = []
+NAMES: List[str] = []
+LATS: np.ndarray = np.empty(0, dtype=np.float64)
+LONS: np.ndarray = np.empty(0, dtype=np.float64)
+
+# IATA/local code -> row index into the arrays above
+CODE_TO_IDX: Dict[str, int] = {}
+
+
+def _reset() -> None:
+    global CODES, NAMES, LATS, LONS, CODE_TO_IDX
+    CODES = []
+    NAMES = []
+    LATS = np.empty(0, dtype=np.float64)
+    LONS = np.empty(0, dtype=np.float64)
+    CODE_TO_IDX = {}
 
 
 def load_airports() -> None:
@@ -18,25 +35,30 @@ def load_airports() -> None:
         ...
       }
     """
-    global AIRPORT_INDEX
+    global CODES, NAMES, LATS, LONS, CODE_TO_IDX
 
     path = Path(__file__).with_name("airports.json")
     if not path.exists():
         print(f"[airports] airports.json not found at {path}, airport lookup disabled")
-        AIRPORT_INDEX = {}
+        _reset()
         return
 
     try:
-        data = json.loads(path.read_text(encoding="utf-8"))
+        data = orjson.loads(path.read_bytes())
         if isinstance(data, dict):
-            AIRPORT_INDEX = data
-            print(f"[airports] Loaded {len(AIRPORT_INDEX)} airports from {path}")
+            records = list(data.values())
+            CODES = list(data.keys())
+            NAMES = [r.get("name") or "" for r in records]
+            LATS = np.asarray([r["lat"] for r in records], dtype=np.float64)
+            LONS = np.asarray([r["lon"] for r in records], dtype=np.float64)
+            CODE_TO_IDX = {code: i for i, code in enumerate(CODES)}
+            print(f"[airports] Loaded {len(CODES)} airports from {path}")
         else:
             print(f"[airports] Invalid airports.json structure at {path}")
-            AIRPORT_INDEX = {}
+            _reset()
     except Exception as e:
         print(f"[airports] Error loading airports.json from {path}: {e}")
-        AIRPORT_INDEX = {}
+        _reset()
 
 
 def lookup_airport(code: str) -> Optional[Dict[str, Any]]:
@@ -50,8 +72,10 @@ def lookup_airport(code: str) -> Optional[Dict[str, Any]]:
     """
     if not code:
         return None
-    if not AIRPORT_INDEX:
-        # Not loaded or failed to load
+
+    # Empty if not loaded or failed to load
+    i = CODE_TO_IDX.get(code.strip().upper())
+    if i is None:
         return None
 
-    return AIRPORT_INDEX.get(code.strip().upper())
+    return {"lat": float(LATS[i]), "lon": float(LONS[i]), "name": NAMES[i]}
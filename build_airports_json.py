@@ -1,5 +1,5 @@
-import csv
-import json
+import orjson
+import pandas as pd
 from pathlib import Path
 
 
@@ -18,37 +18,39 @@ def build_airports_json(csv_path: Path, json_path: Path) -> None:
       - ARPT_NAME    (airport name)
       - LAT_DECIMAL  (latitude in decimal degrees)
       - LONG_DECIMAL (longitude in decimal degrees)
-    """
-    airports = {}
-
-    with csv_path.open(newline="", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-
-        for row in reader:
-            code = (row.get("ARPT_ID") or "").strip().upper()
-            name = (row.get("ARPT_NAME") or "").strip()
-
-            lat_val = row.get("LAT_DECIMAL") or ""
-            lon_val = row.get("LONG_DECIMAL") or ""
 
-            # Skip rows without a code
-            if not code:
-                continue
-
-            try:
-                lat = float(lat_val)
-                lon = float(lon_val)
-            except (TypeError, ValueError):
-                # Bad / missing coordinates, skip
-                continue
-
-            airports[code] = {
-                "lat": lat,
-                "lon": lon,
-                "name": name,
-            }
-
-    json_path.write_text(json.dumps(airports), encoding="utf-8")
+    Parsing uses pandas, a build-time dependency only (see
+    requirements-build.txt); the web app does not need it.
+    """
+    df = pd.read_csv(
+        csv_path,
+        usecols=["ARPT_ID", "ARPT_NAME", "LAT_DECIMAL", "LONG_DECIMAL"],
+        dtype=str,
+        keep_default_na=False,  # don't turn codes like "NA" into NaN
+        encoding="utf-8",
+    )
+
+    df["ARPT_ID"] = df["ARPT_ID"].str.strip().str.upper()
+    df["ARPT_NAME"] = df["ARPT_NAME"].str.strip()
+
+    # Bad / missing coordinates become NaN and are skipped
+    df["LAT_DECIMAL"] = pd.to_numeric(df["LAT_DECIMAL"], errors="coerce")
+    df["LONG_DECIMAL"] = pd.to_numeric(df["LONG_DECIMAL"], errors="coerce")
+
+    # Skip rows without a code or coordinates
+    df = df[df["ARPT_ID"] != ""].dropna(subset=["LAT_DECIMAL", "LONG_DECIMAL"])
+
+    airports = {
+        code: {"lat": lat, "lon": lon, "name": name}
+        for code, name, lat, lon in zip(
+            df["ARPT_ID"].tolist(),
+            df["ARPT_NAME"].tolist(),
+            df["LAT_DECIMAL"].tolist(),
+            df["LONG_DECIMAL"].tolist(),
+        )
+    }
+
+    json_path.write_bytes(orjson.dumps(airports, option=orjson.OPT_SORT_KEYS))
     print(f"Wrote {len(airports)} airport codes to {json_path}")
 
 
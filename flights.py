@@ -1,30 +1,40 @@
+import asyncio
 import os
+import time
 import httpx
-from datetime import datetime
-from math import radians, sin, cos, sqrt, atan2, degrees
+import orjson
+import numpy as np
+from functools import partial
+from math import radians, sin, cos, ceil
 from typing import List, Dict, Tuple, Optional
+from cachetools import TTLCache
 from pydantic import BaseModel
 
 from config import settings
+from _flight_parse import parse_aircraft
 
 # ---------------------------------------------------------------------
 # Default center & radius (from env/settings)
 # ---------------------------------------------------------------------
 
 
+# Fixed for the life of the process, so resolve once at import
+_DEFAULT_CENTER: Tuple[float, float] = (
+    float(os.getenv("FLIGHTWALL_CENTER_LAT", getattr(settings, "center_lat", 0.0))),
+    float(os.getenv("FLIGHTWALL_CENTER_LON", getattr(settings, "center_lon", 0.0))),
+)
+_DEFAULT_RADIUS_KM: float = float(
+    os.getenv("FLIGHTWALL_RADIUS_KM", getattr(settings, "radius_km", 200.0))
+)
+
+
 def get_current_center() -> Tuple[float, float]:
     """
     Default center (lat, lon) from env variables or settings.
     This is now only a fallback; actual center is per-user and
     passed in from the client.
     """
-    center_lat = float(
-        os.getenv("FLIGHTWALL_CENTER_LAT", getattr(settings, "center_lat", 0.0))
-    )
-    center_lon = float(
-        os.getenv("FLIGHTWALL_CENTER_LON", getattr(settings, "center_lon", 0.0))
-    )
-    return center_lat, center_lon
+    return _DEFAULT_CENTER
 
 
 def get_radius_km() -> float:
@@ -32,9 +42,7 @@ def get_radius_km() -> float:
     Default radius in kilometers, derived from env or settings.
     Used as a fallback if the client does not supply radius_nm.
     """
-    return float(
-        os.getenv("FLIGHTWALL_RADIUS_KM", getattr(settings, "radius_km", 200.0))
-    )
+    return _DEFAULT_RADIUS_KM
 
 
 # ---------------------------------------------------------------------
@@ -42,107 +50,31 @@ def get_radius_km() -> float:
 # ---------------------------------------------------------------------
 
 
-def haversine(lat1, lon1, lat2, lon2):
-    """Calculate distance (km) between two lat/lon points."""
-    R = 6371.0
-    dlat = radians(lat2 - lat1)
-    dlon = radians(lon2 - lon1)
-    a = (
-        sin(dlat / 2) ** 2
-        + cos(radians(lat1)) * cos(radians(lat2)) * sin(dlon / 2) ** 2
-    )
-    c = 2 * atan2(sqrt(a), sqrt(1 - a))
-    return R * c
-
-
-def bearing(lat1, lon1, lat2, lon2):
-    """Calculate bearing (degrees) from point A to B."""
-    dlon = radians(lon2 - lon1)
-    x = sin(dlon) * cos(radians(lat2))
-    y = cos(radians(lat1)) * sin(radians(lat2)) - sin(radians(lat1)) * cos(
-        radians(lat2)
-    ) * cos(dlon)
-    b = atan2(x, y)
-    return (degrees(b) + 360) % 360
-
-
-# ---------------------------------------------------------------------
-# Airline lookup
-# ---------------------------------------------------------------------
-
-
-AIRLINE_PREFIXES: Dict[str, str] = {
-    "DAL": "Delta",
-    "AAL": "American",
-    "UAL": "United",
-    "SWA": "Southwest",
-    "JBU": "JetBlue",
-    "NKS": "Spirit",
-    "FFT": "Frontier",
-    "ASA": "Alaska",
-    "RPA": "Republic",
-    "SKW": "SkyWest",
-    "ENY": "Envoy",
-    "GJS": "GoJet",
-    "EJA": "NetJets",
-    "EJM": "Executive Jet Management",
-    "UPS": "UPS",
-    "FDX": "FedEx",
-    "JIA": "PSA",
-    "PDT": "Piedmont",
-    "CPZ": "Compass",
-    "N": "GA Aircraft",
-    "EDV": "Endeavor",
-    "CJT": "CargoJet",
-}
-
-
-def get_airline_from_callsign(callsign: str) -> Optional[str]:
+def haversine_from_center(
+    clat_rad: float, cos_clat: float, lats_rad: np.ndarray, cos_lats: np.ndarray, dlon: np.ndarray
+) -> np.ndarray:
     """
-    Determine airline name from callsign prefix.
-    Example:
-      DAL2968 -> Delta
-      UAL1525 -> United
-      N447MM  -> GA Aircraft
-    """
-    if not callsign:
-        return None
-
-    cs = callsign.strip().upper()
-
-    # US N-number
-    if cs.startswith("N") and len(cs) >= 2 and cs[1].isalnum():
-        return AIRLINE_PREFIXES.get("N")
-
-    prefix = ""
-    for ch in cs:
-        if ch.isalpha():
-            prefix += ch
-        else:
-            break
-        if len(prefix) == 3:
-            break
+    Vectorized haversine (km) from a fixed center to many points.
 
-    if not prefix:
-        return None
-
-    return AIRLINE_PREFIXES.get(prefix)
-
-
-# ---------------------------------------------------------------------
-# Aircraft type lookup
-# ---------------------------------------------------------------------
+    Takes the center's radians(lat) / cos(lat) precomputed, plus the
+    points' radians(lat), cos(lat) and radians(lon - center_lon), so
+    they can be shared with bearing_from_center().
+    """
+    R = 6371.0
+    dlat = lats_rad - clat_rad
+    a = np.sin(dlat / 2) ** 2 + cos_clat * cos_lats * np.sin(dlon / 2) ** 2
+    c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+    return R * c
 
 
-def get_aircraft_type(ac: dict) -> Optional[str]:
-    """Try multiple possible keys for aircraft type."""
-    for key in ("t", "type", "icao_type", "mdl"):
-        val = ac.get(key)
-        if isinstance(val, str):
-            val = val.strip()
-            if val and val.lower() != "adsb_icao":
-                return val
-    return None
+def bearing_from_center(
+    sin_clat: float, cos_clat: float, lats_rad: np.ndarray, cos_lats: np.ndarray, dlon: np.ndarray
+) -> np.ndarray:
+    """Vectorized bearing (degrees) from a fixed center to many points."""
+    x = np.sin(dlon) * cos_lats
+    y = cos_clat * np.sin(lats_rad) - sin_clat * cos_lats * np.cos(dlon)
+    b = np.arctan2(x, y)
+    return (np.degrees(b) + 360) % 360
 
 
 # ---------------------------------------------------------------------
@@ -161,81 +93,99 @@ class Flight(BaseModel):
     bearing_deg: Optional[float] = None
     gs: Optional[float] = None          # ground speed (knots) from ADS-B "gs"
     baro_rate: Optional[int] = None     # vertical speed (fpm) from ADS-B "baro_rate"
-    updated_at: datetime
+    updated_at: int                     # epoch seconds (UTC) of the fetch
 
 
 # ---------------------------------------------------------------------
 # Route lookup cache
 # ---------------------------------------------------------------------
 
-route_cache: Dict[str, Tuple[Optional[str], Optional[str]]] = {}
+# Bounded so callsign churn on a long-running server can't grow it forever;
+# routes are re-fetched after a day.
+route_cache: TTLCache = TTLCache(maxsize=20000, ttl=24 * 3600)
 
 
-async def enrich_routes_adsbdb(flights: List[Flight]) -> None:
-    """Fill in origin/destination via adsbdb.com (free API)."""
-    if not getattr(settings, "route_lookup_enabled", False):
-        return
+def _pick_airport(apt: Optional[dict]) -> Optional[str]:
+    """Best available code/name for an adsbdb airport object."""
+    if not isinstance(apt, dict):
+        return None
+    for key in ("icao_code", "iata_code", "name"):
+        val = apt.get(key)
+        if isinstance(val, str) and val.strip():
+            return val.strip()
+    return None
 
-    max_new = getattr(settings, "route_max_new_per_cycle", 2)
-    new_count = 0
 
-    async with httpx.AsyncClient(timeout=5, follow_redirects=True) as client:
-        for f in flights:
-            if f.origin or f.destination:
-                continue
+async def _fetch_route(
+    client: httpx.AsyncClient, cs: str
+) -> Tuple[Optional[str], Optional[str]]:
+    """Look up (origin, destination) for one callsign on adsbdb.com."""
+    url = f"{settings.adsbdb_base_url}/callsign/{cs}"
+    resp = await client.get(
+        url, headers={"User-Agent": "flightwall-web/0.1"}, timeout=5
+    )
+
+    if resp.status_code == 404:
+        return None, None
+
+    resp.raise_for_status()
+    data = orjson.loads(resp.content) or {}
+    response = data.get("response") or {}
+    fr = response.get("flightroute") or {}
+
+    return _pick_airport(fr.get("origin")), _pick_airport(fr.get("destination"))
 
-            cs = (f.callsign or "").strip().upper()
-            if not cs:
-                continue
 
-            # Cached
-            if cs in route_cache:
-                f.origin, f.destination = route_cache[cs]
-                continue
+async def enrich_routes_adsbdb(client: httpx.AsyncClient, flights: List[Flight]) -> None:
+    """
+    Fill in origin/destination via adsbdb.com (free API).
 
-            if new_count >= max_new:
-                continue
+    client: shared AsyncClient (see main.py lifespan).
+    """
+    if not getattr(settings, "route_lookup_enabled", False):
+        return
 
-            url = f"{settings.adsbdb_base_url}/callsign/{cs}"
+    max_new = getattr(settings, "route_max_new_per_cycle", 2)
 
-            try:
-                resp = await client.get(
-                    url, headers={"User-Agent": "flightwall-web/0.1"}
-                )
+    # Uncached callsigns to look up this cycle -> flights waiting on them
+    pending: Dict[str, List[Flight]] = {}
 
-                if resp.status_code == 404:
-                    route_cache[cs] = (None, None)
-                    new_count += 1
-                    continue
+    for f in flights:
+        if f.origin or f.destination:
+            continue
 
-                resp.raise_for_status()
-                data = resp.json() or {}
-                response = data.get("response") or {}
-                fr = response.get("flightroute") or {}
+        # Already stripped/upper-cased by parse_aircraft
+        cs = f.callsign
+        if not cs:
+            continue
 
-                origin_obj = fr.get("origin") or {}
-                dest_obj = fr.get("destination") or {}
+        # Cached
+        if cs in route_cache:
+            f.origin, f.destination = route_cache[cs]
+            continue
 
-                def pick(apt: Optional[dict]) -> Optional[str]:
-                    if not isinstance(apt, dict):
-                        return None
-                    for key in ("icao_code", "iata_code", "name"):
-                        val = apt.get(key)
-                        if isinstance(val, str) and val.strip():
-                            return val.strip()
-                    return None
+        if cs in pending:
+            pending[cs].append(f)
+        elif len(pending) < max_new:
+            pending[cs] = [f]
 
-                origin = pick(origin_obj)
-                dest = pick(dest_obj)
+    if not pending:
+        return
 
-                f.origin = origin
-                f.destination = dest
+    # Issue all lookups concurrently rather than one RTT after another
+    results = await asyncio.gather(
+        *(_fetch_route(client, cs) for cs in pending),
+        return_exceptions=True,
+    )
 
-                route_cache[cs] = (origin, dest)
-                new_count += 1
+    for (cs, waiting), result in zip(pending.items(), results):
+        if isinstance(result, BaseException):
+            print("ADSBDB route error for", cs, ":", result)
+            continue
 
-            except Exception as e:
-                print("ADSBDB route error for", cs, ":", e)
+        route_cache[cs] = result
+        for f in waiting:
+            f.origin, f.destination = result
 
 
 # ---------------------------------------------------------------------
@@ -243,7 +193,86 @@ async def enrich_routes_adsbdb(flights: List[Flight]) -> None:
 # ---------------------------------------------------------------------
 
 
+def _as_float(val, default: float) -> float:
+    """float(val), or default if val is missing or not numeric."""
+    if val is None:
+        return default
+    try:
+        return float(val)
+    except (TypeError, ValueError):
+        return default
+
+
+# Short-lived cache of upstream aircraft lists keyed by rounded
+# (lat, lon, radius_nm). ADS-B positions only refresh every few seconds,
+# so nearby clients polling together can share one upstream fetch.
+aircraft_cache: TTLCache = TTLCache(maxsize=256, ttl=8)
+
+# Upstream fetch currently running for each key, shared by all callers
+_aircraft_inflight: Dict[Tuple[float, float, int], "asyncio.Task[Optional[List[dict]]]"] = {}
+
+
+async def _request_aircraft(
+    client: httpx.AsyncClient, lat: float, lon: float, radius_nm: int
+) -> Optional[List[dict]]:
+    """Fetch the raw ADS-B aircraft list from upstream, or None on error."""
+    url = f"{settings.adsb_base_url}/point/{lat}/{lon}/{radius_nm:.2f}"
+
+    headers = {}
+    if getattr(settings, "adsb_api_key", None):
+        headers["api-auth"] = settings.adsb_api_key
+
+    try:
+        r = await client.get(url, headers=headers)
+        r.raise_for_status()
+        data = orjson.loads(r.content)
+    except Exception as e:
+        print("ADSB API error:", e)
+        return None
+
+    return data.get("ac", [])
+
+
+def _aircraft_done(key: Tuple[float, float, int], task: "asyncio.Task[Optional[List[dict]]]") -> None:
+    # Runs before any waiter resumes, so the cache is filled by then
+    _aircraft_inflight.pop(key, None)
+    if not task.cancelled() and task.result() is not None:
+        aircraft_cache[key] = task.result()
+
+
+async def _fetch_aircraft(
+    client: httpx.AsyncClient, center_lat: float, center_lon: float, radius_nm: float
+) -> Optional[List[dict]]:
+    """
+    Return the raw ADS-B aircraft list around a center, or None on error.
+
+    The upstream query uses the rounded key values, so a cached list
+    matches its key. Rounding the center can shift it by up to ~0.8 km,
+    so the radius is padded by 0.5 NM (~0.93 km) before rounding up; the
+    result can therefore include aircraft slightly outside radius_nm and
+    callers must filter by distance. Concurrent callers for the same key
+    share a single in-flight fetch and all get its result, success or
+    failure.
+    """
+    # Upstream caps point queries at 250 NM, same as get_flights' clamp
+    key = (round(center_lat, 2), round(center_lon, 2), min(250, ceil(radius_nm + 0.5)))
+
+    cached = aircraft_cache.get(key)
+    if cached is not None:
+        return cached
+
+    task = _aircraft_inflight.get(key)
+    if task is None:
+        task = asyncio.create_task(_request_aircraft(client, *key))
+        task.add_done_callback(partial(_aircraft_done, key))
+        _aircraft_inflight[key] = task
+
+    # Shield so one caller being cancelled doesn't cancel the shared fetch
+    return await asyncio.shield(task)
+
+
 async def get_flights(
+    client: httpx.AsyncClient,
     center_lat: Optional[float] = None,
     center_lon: Optional[float] = None,
     radius_nm: Optional[float] = None,
@@ -251,6 +280,10 @@ async def get_flights(
     """
     Fetch aircraft and compute distance/bearing from a given center.
 
+    client:
+      - Shared AsyncClient owned by the app (see main.py lifespan), so
+        connections to the ADS-B and route APIs are kept alive.
+
     center_lat/center_lon:
       - If provided, use these coords.
       - If None, fall back to default center from env/settings.
@@ -271,90 +304,69 @@ async def get_flights(
         except Exception:
             center_lat, center_lon = get_current_center()
 
-    # Determine radius in NM
-    if radius_nm is None:
-        radius_km = get_radius_km()
-        try:
-            radius_nm = float(radius_km) / 1.852
-        except Exception:
-            radius_nm = 200.0 / 1.852  # fallback
-    else:
-        try:
-            radius_nm = float(radius_nm)
-        except Exception:
-            radius_km = get_radius_km()
-            radius_nm = float(radius_km) / 1.852
+    # Determine radius in NM (fallback: configured radius_km), clamped to 10–250 NM
+    radius_nm = max(10.0, min(250.0, _as_float(radius_nm, get_radius_km() / 1.852)))
 
-    # Clamp to 10–250 NM
-    if radius_nm < 10.0:
-        radius_nm = 10.0
-    if radius_nm > 250.0:
-        radius_nm = 250.0
-
-    url = f"{settings.adsb_base_url}/point/{center_lat}/{center_lon}/{radius_nm:.2f}"
-
-    headers = {}
-    if getattr(settings, "adsb_api_key", None):
-        headers["api-auth"] = settings.adsb_api_key
-
-    try:
-        async with httpx.AsyncClient(timeout=10, follow_redirects=True) as client:
-            r = await client.get(url, headers=headers)
-            r.raise_for_status()
-            data = r.json()
-    except Exception as e:
-        print("ADSB API error:", e)
+    aircraft_list = await _fetch_aircraft(client, center_lat, center_lon, radius_nm)
+    if aircraft_list is None:
         return []
 
-    now = datetime.utcnow()
-    flights: List[Flight] = []
-
-    aircraft_list = data.get("ac", [])
-
-    for ac in aircraft_list:
-        callsign = ac.get("flight") or ac.get("callsign") or None
-        if not callsign:
-            continue
-
-        lat = ac.get("lat")
-        lon = ac.get("lon")
-        alt = ac.get("alt_baro")
-
-        # Motion fields from ADS-B
-        gs = ac.get("gs")
-        baro_rate = ac.get("baro_rate")
-
-        if lat is None or lon is None:
-            continue
-
-        # Distance and bearing from our center
-        dist = haversine(center_lat, center_lon, lat, lon)
-        brg = bearing(center_lat, center_lon, lat, lon)
-
-        flights.append(
-            Flight(
-                callsign=callsign.strip(),
-                airline=get_airline_from_callsign(callsign),
-                origin=None,
-                destination=None,
-                aircraft_type=get_aircraft_type(ac),
-                altitude_ft=int(alt) if isinstance(alt, (int, float)) else None,
-                distance_km=dist,
-                bearing_deg=brg,
-                gs=float(gs) if isinstance(gs, (int, float)) else None,
-                baro_rate=int(baro_rate) if isinstance(baro_rate, (int, float)) else None,
-                updated_at=now,
-            )
+    now = int(time.time())
+
+    # Keep only aircraft we can place on the wall
+    valid = [
+        ac
+        for ac in aircraft_list
+        if (ac.get("flight") or ac.get("callsign"))
+        and ac.get("lat") is not None
+        and ac.get("lon") is not None
+    ]
+
+    # Center trig terms are fixed for the whole batch; compute them once
+    clat_rad = radians(center_lat)
+    cos_clat = cos(clat_rad)
+    sin_clat = sin(clat_rad)
+
+    # Distance and bearing from our center, in one vectorized pass
+    lats = np.fromiter((ac["lat"] for ac in valid), dtype=np.float64, count=len(valid))
+    lons = np.fromiter((ac["lon"] for ac in valid), dtype=np.float64, count=len(valid))
+    lats_rad = np.radians(lats)
+    cos_lats = np.cos(lats_rad)
+    dlon = np.radians(lons - center_lon)
+    dists = haversine_from_center(clat_rad, cos_clat, lats_rad, cos_lats, dlon)
+    brgs = bearing_from_center(sin_clat, cos_clat, lats_rad, cos_lats, dlon)
+
+    # The shared upstream query is padded; keep only the requested circle
+    keep = dists <= radius_nm * 1.852
+    if not keep.all():
+        valid = [ac for ac, k in zip(valid, keep.tolist()) if k]
+        dists = dists[keep]
+        brgs = brgs[keep]
+
+    # Field values are already coerced to the model's types by
+    # parse_aircraft, so skip pydantic validation for each record.
+    flights = [
+        Flight.model_construct(**parse_aircraft(ac, dist, brg, now))
+        for ac, dist, brg in zip(valid, dists.tolist(), brgs.tolist())
+    ]
+
+    # Sort by distance then (descending) altitude. Each aircraft in
+    # `valid` produced one flight, so `dists` lines up with `flights`.
+    if len(flights) > 100:
+        # Large batches: sort on the key arrays in C
+        alts = np.fromiter(
+            (f.altitude_ft or 0 for f in flights), dtype=np.int64, count=len(flights)
         )
-
-    # Sort by distance then (descending) altitude
-    flights.sort(
-        key=lambda f: (
-            f.distance_km if f.distance_km is not None else 1e9,
-            -(f.altitude_ft or 0),
+        order = np.lexsort((-alts, dists))
+        flights = [flights[i] for i in order.tolist()]
+    else:
+        flights.sort(
+            key=lambda f: (
+                f.distance_km if f.distance_km is not None else 1e9,
+                -(f.altitude_ft or 0),
+            )
         )
-    )
 
-    await enrich_routes_adsbdb(flights)
+    await enrich_routes_adsbdb(client, flights)
 
     return flights
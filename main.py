@@ -1,7 +1,9 @@
 import os
+from contextlib import asynccontextmanager
 from typing import List, Optional
 
-from fastapi import FastAPI, HTTPException
+import httpx
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse
 from pydantic import BaseModel
@@ -15,7 +17,26 @@ from flights import (
 )
 from airports import load_airports, lookup_airport
 
-app = FastAPI(title="FlightWall Web")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Own a single long-lived HTTP client for upstream APIs, so requests
+    reuse pooled keep-alive (HTTP/2) connections instead of paying
+    DNS + TCP + TLS setup every time.
+    """
+    app.state.http = httpx.AsyncClient(
+        http2=True,
+        timeout=10,
+        follow_redirects=True,
+        limits=httpx.Limits(max_keepalive_connections=20),
+    )
+    try:
+        yield
+    finally:
+        await app.state.http.aclose()
+
+
+app = FastAPI(title="FlightWall Web", lifespan=lifespan)
 
 # Load airports data at startup
 load_airports()
@@ -74,6 +95,7 @@ async def api_get_config():
 
 @app.get("/api/flights", response_model=List[Flight])
 async def api_flights(
+    request: Request,
     radius_nm: Optional[float] = None,
     center_lat: Optional[float] = None,
     center_lon: Optional[float] = None,
@@ -87,6 +109,7 @@ async def api_flights(
         if omitted, backend falls back to default center.
     """
     flights = await get_flights(
+        request.app.state.http,
         center_lat=center_lat,
         center_lon=center_lon,
         radius_nm=radius_nm,